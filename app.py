@@ -1,5 +1,7 @@
 import os
-from flask import Flask, request, jsonify, make_response
+from datetime import datetime
+from flask import Flask, Response, request
+from orjson import dumps, OPT_SERIALIZE_NUMPY
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -10,18 +12,26 @@ from utils.logger import setup_logger
 app = Flask(__name__)
 CORS(app)
 
+def ojson(obj, status=200):
+    """Serialize a response body with orjson"""
+    return Response(dumps(obj, option=OPT_SERIALIZE_NUMPY), status=status, mimetype='application/json')
+
 # Initialize logger
 logger = setup_logger()
 
 # Initialize face recognition service
 face_recognition_service = FaceRecognitionService()
 
-# Rate limiting
+# Rate limiting, shared across workers through Redis; falls back to
+# per-process memory while Redis is unreachable
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["50 per minute", "1000 per day"],
-    storage_uri="memory://"
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'redis://localhost:6379/1'),
+    storage_options={"socket_connect_timeout": 0.1, "socket_timeout": 0.1},
+    strategy="moving-window",
+    in_memory_fallback_enabled=True
 )
 
 # Error handling
@@ -30,25 +40,26 @@ def handle_error(e):
     logger.error(f"Error occurred: {str(e)}", exc_info=True)
     
     if isinstance(e, HTTPException):
-        return jsonify({
+        return ojson({
             "status": "error",
             "message": e.description,
             "code": e.code
-        }), e.code
+        }, e.code)
     
-    return jsonify({
+    return ojson({
         "status": "error",
         "message": "Internal server error",
         "code": 500
-    }), 500
+    }, 500)
 
 # Health check endpoint
 @app.route('/health', methods=['GET'])
+@app.route('/api/health', methods=['GET'])
 def health_check():
     try:
         # Check if face recognition service is available
         face_recognition_service.ping()
-        return jsonify({
+        return ojson({
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "dependencies": {
@@ -57,11 +68,11 @@ def health_check():
         })
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
-        return jsonify({
+        return ojson({
             "status": "error",
             "message": "Service unavailable",
             "timestamp": datetime.utcnow().isoformat()
-        }), 503
+        }, 503)
 
 @app.route('/api/register_face', methods=['POST'])
 @limiter.limit("5/minute;100/day", error_message="Too many requests. Please try again later.")
@@ -117,7 +128,7 @@ def register_face():
         # Add timeout to face recognition operation
         result = face_recognition_service.register_face(user_id, image_data, metadata)
         
-        return jsonify({
+        return ojson({
             "status": "success",
             "message": "Face registered successfully",
             "data": result
@@ -125,18 +136,15 @@ def register_face():
         
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
-        return jsonify({
+        return ojson({
             "status": "error",
             "message": str(ve),
             "code": 400
-        }), 400
+        }, 400)
         
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
-        raise        
-    except Exception as e:
-        logger.error(f"Error in register_face: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        raise
 
 @app.route('/api/verify_face', methods=['POST'])
 def verify_face():
@@ -146,29 +154,29 @@ def verify_face():
     Request Body:
     {
         "image_data": "base64_encoded_image",
-        "min_confidence": 0.7 (optional)
+        "min_confidence": 0.363 (optional, SFace cosine similarity; defaults to the service threshold)
     }
     """
     try:
         data = request.json
         
         if not data:
-            return jsonify({"status": "error", "message": "Invalid request"}), 400
+            return ojson({"status": "error", "message": "Invalid request"}, 400)
             
         image_data = data.get('image_data')
-        min_confidence = data.get('min_confidence', 0.7)
+        min_confidence = data.get('min_confidence')
         
         if not image_data:
-            return jsonify({"status": "error", "message": "Missing image_data"}), 400
+            return ojson({"status": "error", "message": "Missing image_data"}, 400)
             
         logger.info("Verifying face...")
         
         result = face_recognition_service.verify_face(image_data, min_confidence)
-        return jsonify(result)
+        return ojson(result)
         
     except Exception as e:
         logger.error(f"Error in verify_face: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojson({"status": "error", "message": str(e)}, 500)
 
 @app.route('/api/get_user_faces', methods=['GET'])
 def get_user_faces():
@@ -182,16 +190,16 @@ def get_user_faces():
         user_id = request.args.get('user_id')
         
         if not user_id:
-            return jsonify({"status": "error", "message": "Missing user_id"}), 400
+            return ojson({"status": "error", "message": "Missing user_id"}, 400)
             
         logger.info(f"Getting face info for user: {user_id}")
         
         result = face_recognition_service.get_user_faces(user_id)
-        return jsonify(result)
+        return ojson(result)
         
     except Exception as e:
         logger.error(f"Error in get_user_faces: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojson({"status": "error", "message": str(e)}, 500)
 
 @app.route('/api/update_metadata', methods=['POST'])
 def update_metadata():
@@ -212,50 +220,32 @@ def update_metadata():
         data = request.json
         
         if not data:
-            return jsonify({"status": "error", "message": "Invalid request"}), 400
+            return ojson({"status": "error", "message": "Invalid request"}, 400)
             
         user_id = data.get('user_id')
         metadata = data.get('metadata')
         
         if not user_id or not metadata:
-            return jsonify({"status": "error", "message": "Missing required fields"}), 400
+            return ojson({"status": "error", "message": "Missing required fields"}, 400)
             
         logger.info(f"Updating metadata for user: {user_id}")
         
         result = face_recognition_service.update_metadata(user_id, metadata)
-        return jsonify(result)
+        return ojson(result)
         
     except Exception as e:
         logger.error(f"Error in update_metadata: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """
-    Health check endpoint
-    Returns:
-        dict: Service status
-    """
-    try:
-        logger.info("Health check request received")
-        return jsonify({
-            "status": "healthy",
-            "service": "face_recognition",
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.error(f"Error in health check: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return ojson({"status": "error", "message": str(e)}, 500)
 
 @app.errorhandler(404)
 def not_found_error(error):
     logger.error(f"404 error: {str(error)}")
-    return jsonify({"status": "error", "message": "Endpoint not found"}), 404
+    return ojson({"status": "error", "message": "Endpoint not found"}, 404)
 
 @app.errorhandler(500)
 def internal_error(error):
     logger.error(f"500 error: {str(error)}")
-    return jsonify({"status": "error", "message": "Internal server error"}), 500
+    return ojson({"status": "error", "message": "Internal server error"}, 500)
 
 # For local development
 if __name__ == '__main__':
@@ -0,0 +1,26 @@
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Registered faces are held in per-process memory and every process writes
+# the same embedding and metadata files, so exactly one worker serves every
+# request; concurrency comes from threads, which overlap image decoding and
+# I/O, take turns on the detector and share batched SFace forward passes
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 2 * multiprocessing.cpu_count() + 1))
+
+# Keep client connections open between requests
+keepalive = 5
+timeout = 60
+
+# Importing the app starts the log listener thread and the service's worker
+# pools, which don't survive fork, so each worker imports it after forking
+preload_app = False
+
+
+def on_starting(server):
+    """Refuse worker counts that would have processes clobber each other's face store"""
+    if server.cfg.workers != 1:
+        raise RuntimeError(f"Face storage isn't shared between processes; run 1 worker, not {server.cfg.workers}")
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_batch_size=16, max_wait=0.0):
+        """
+        Coalesce concurrent inference requests into batched predictions
+
+        A single worker thread collects up to `max_batch_size` pending inputs,
+        waiting at most `max_wait` seconds after the first one arrives, and
+        runs them through `predict` in one call. With no wait, a batch is
+        whatever queued up while the previous one ran, so batching costs a
+        lone request nothing.
+
+        Args:
+            predict (callable): Maps a stacked (B, ...) array to B outputs
+            max_batch_size (int): Maximum number of inputs per batch
+            max_wait (float): Seconds to wait for a batch to fill up
+        """
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item):
+        """
+        Queue a single input for inference
+
+        Args:
+            item (np.ndarray): One un-batched model input
+
+        Returns:
+            Future: Resolves to the model output for `item`
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        """Start the worker thread on first use"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """Block for one pending input, then gather more until full or timed out"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Past the deadline, still take anything already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            # Drop requests whose callers already gave up
+            batch = [(item, future) for item, future in self._next_batch()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            items, futures = zip(*batch)
+            try:
+                outputs = self.predict(np.stack(items))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
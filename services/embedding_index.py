@@ -0,0 +1,195 @@
+import os
+import numpy as np
+
+# Numba is optional; without it searches fall back to blocked NumPy matmuls
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+INITIAL_CAPACITY = 64
+SEARCH_BLOCK_ROWS = 4096
+
+
+def _normalize(vectors):
+    """Scale vectors to unit L2 norm along the last axis"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def _quantize(vectors):
+    """
+    Symmetric per-vector int8 quantization of unit-normalized vectors
+
+    Returns:
+        tuple: (int8 codes, float32 scales) with vectors ~= codes * scales
+    """
+    vectors = _normalize(vectors)
+    scales = np.maximum(np.max(np.abs(vectors), axis=-1) / 127, np.finfo(np.float32).tiny)
+    codes = np.round(vectors / scales[..., None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+if njit is not None:
+    # Serial on purpose: the scan is memory-bound, and parallel kernels run
+    # from worker threads block interpreter shutdown under the TBB layer
+    @njit(fastmath=True, cache=True)
+    def _scan(codes, scales, query):
+        """Score every int8 row against a float32 query without widening the matrix"""
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for i in range(codes.shape[0]):
+            acc = np.float32(0.0)
+            for j in range(codes.shape[1]):
+                acc += codes[i, j] * query[j]
+            scores[i] = acc * scales[i]
+        return scores
+
+
+class EmbeddingIndex:
+    def __init__(self, path):
+        """
+        Nearest-neighbour index over registered face embeddings
+
+        Embeddings are L2-normalized and quantized to int8 with a float32 scale
+        per vector. Codes and scales live in growable memory-mapped .npy files
+        with a parallel list of user IDs. Matching is by cosine similarity,
+        i.e. a single inner product against every row.
+
+        Args:
+            path (str): Path of the .npy file holding the int8 codes; scales
+                are stored alongside it in `<name>_scales.npy`
+        """
+        self.path = path
+        self.scales_path = f"{os.path.splitext(path)[0]}_scales.npy"
+        self.codes = None
+        self.scales = None
+        self.user_ids = []
+        self._positions = {}
+
+        # Compile the scan now rather than on the first search
+        if njit is not None:
+            _scan(np.zeros((1, 1), dtype=np.int8), np.ones(1, dtype=np.float32), np.zeros(1, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def position(self, user_id):
+        """Row of the embedding matrix holding a user's embedding"""
+        return self._positions[user_id]
+
+    def load(self, user_ids):
+        """
+        Memory-map the embedding matrix from disk
+
+        Args:
+            user_ids (list): User IDs in matrix row order
+        """
+        self.user_ids = list(user_ids)
+        self._positions = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        self.codes = np.lib.format.open_memmap(self.path, mode='r+')
+        self.scales = np.lib.format.open_memmap(self.scales_path, mode='r+')
+
+    def build(self, embeddings):
+        """
+        Rebuild the index and its backing files from scratch
+
+        Args:
+            embeddings (dict): Mapping of user ID to embedding vector
+        """
+        self.user_ids = list(embeddings.keys())
+        self._positions = {user_id: i for i, user_id in enumerate(self.user_ids)}
+        self.codes = None
+        self.scales = None
+
+        if self.user_ids:
+            codes, scales = _quantize(np.stack([np.asarray(embeddings[user_id], dtype=np.float32) for user_id in self.user_ids]))
+            self._reserve(len(codes), codes.shape[1])
+            self.codes[:len(codes)] = codes
+            self.scales[:len(scales)] = scales
+            self._flush()
+
+    def add(self, user_id, embedding):
+        """
+        Add or replace the embedding for a user
+
+        Args:
+            user_id (str): User ID
+            embedding (array-like): Embedding vector
+        """
+        codes, scale = _quantize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+
+        if user_id in self._positions:
+            row = self._positions[user_id]
+        else:
+            row = len(self.user_ids)
+            self._reserve(row + 1, codes.shape[0])
+
+        self.codes[row] = codes
+        self.scales[row] = scale
+        self._flush()
+
+        if user_id not in self._positions:
+            self._positions[user_id] = row
+            self.user_ids.append(user_id)
+
+    def search(self, embedding):
+        """
+        Find the closest registered embedding
+
+        Args:
+            embedding (array-like): Query embedding vector
+
+        Returns:
+            tuple: (user_id, cosine similarity), or None if the index is empty
+        """
+        if not self.user_ids:
+            return None
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        used = len(self.user_ids)
+
+        if njit is not None:
+            scores = _scan(np.asarray(self.codes[:used]), np.asarray(self.scales[:used]), query)
+        else:
+            # Widen the int8 codes block by block so the float32 copy stays bounded;
+            # integer dot products up to 127 * 127 * D are exact in float32
+            scores = np.empty(used, dtype=np.float32)
+            for start in range(0, used, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, used)
+                scores[start:end] = self.codes[start:end].astype(np.float32) @ query
+            scores *= self.scales[:used]
+
+        # Quantization error can push a near-identical match just past 1
+        best = int(np.argmax(scores))
+        return self.user_ids[best], min(float(scores[best]), 1.0)
+
+    def _flush(self):
+        """Write pending changes to the backing files"""
+        self.codes.flush()
+        self.scales.flush()
+
+    def _reserve(self, rows, dim):
+        """Grow the backing files, doubling their capacity, until they fit `rows`"""
+        if self.codes is not None and rows <= self.codes.shape[0]:
+            return
+
+        capacity = self.codes.shape[0] if self.codes is not None else INITIAL_CAPACITY
+        while capacity < rows:
+            capacity *= 2
+
+        used = len(self.user_ids) if self.codes is not None else 0
+        self.codes = self._grow(self.path, self.codes, used, np.int8, (capacity, dim))
+        self.scales = self._grow(self.scales_path, self.scales, used, np.float32, (capacity,))
+
+    def _grow(self, path, current, used, dtype, shape):
+        """Copy the first `used` rows into a larger .npy file and map it in place of `path`"""
+        tmp_path = f"{path}.tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+        if current is not None:
+            grown[:used] = current[:used]
+        grown.flush()
+        del grown
+
+        os.replace(tmp_path, path)
+        return np.lib.format.open_memmap(path, mode='r+')
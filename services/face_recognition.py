@@ -1,133 +1,534 @@
 import os
 import json
+import hashlib
 import numpy as np
-from deepface import DeepFace
+import redis
+import threading
+import queue
+import cv2
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from PIL import Image
 import io
-import base64
 from datetime import datetime
 import time
+from services.batcher import MicroBatcher
+from services.embedding_index import EmbeddingIndex
 from utils.logger import setup_logger
 
+# pybase64 is a drop-in replacement with SIMD decoding
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# YuNet detects faces and SFace turns aligned 112x112 crops into 128-d embeddings
+EMBEDDING_MODEL = 'SFace'
+# Cosine similarity above which two SFace embeddings are the same person (OpenCV's recommended value)
+SFACE_COSINE_THRESHOLD = 0.363
+SFACE_INPUT_SIZE = (112, 112)
+DEFAULT_DETECTOR_MODEL = os.path.join('models', 'face_detection_yunet_2023mar.onnx')
+DEFAULT_RECOGNIZER_MODEL = os.path.join('models', 'face_recognition_sface_2021dec.onnx')
+
+# OpenCV DNN backend/target pairs; 'openvino' needs an OpenVINO-enabled OpenCV build
+DNN_BACKENDS = {
+    'opencv': (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    'openvino': (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU),
+}
+
+# Most aligned crops embedded together in one SFace forward pass
+EMBEDDING_BATCH_SIZE = 16
+
+# Uploads are downscaled to this longest side before detection, into one of
+# IMAGE_POOL_SIZE reusable buffers
+MAX_IMAGE_SIDE = 640
+IMAGE_POOL_SIZE = 16
+
+# Quality of the JPEG copies kept in storage
+JPEG_QUALITY = 85
+
+# JPEGs can be decoded directly at 1/8, 1/4 or 1/2 scale
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Verification results are cached under a hash of a small grayscale thumbnail
+CACHE_THUMBNAIL_SIZE = (32, 32)
+CACHE_GENERATION_KEY = 'verify:generation'
+CACHE_RETRY_INTERVAL = 30
+
+# Bursts of registrations/updates are coalesced into one metadata write
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+
+def _decode_base64(image_data):
+    """Decode a base64 image payload into raw bytes"""
+    return base64.b64decode(image_data, validate=False)
+
+
 class FaceRecognitionService:
-    def __init__(self, storage_path='face_data', threshold=0.6, timeout=30):
+    def __init__(self, storage_path='face_data', threshold=SFACE_COSINE_THRESHOLD, timeout=30,
+                 redis_url=None, cache_ttl=300, detector_model=None,
+                 recognizer_model=None, dnn_backend=None):
         """
         Initialize the face recognition service
         
         Args:
             storage_path (str): Path to store face data
-            threshold (float): Distance threshold for face matching
+            threshold (float): Default cosine similarity required for a match
             timeout (int): Maximum time to wait for face processing
+            redis_url (str): Redis URL for the verification cache (defaults to $REDIS_URL)
+            cache_ttl (int): Seconds a cached verification result stays valid
+            detector_model (str): YuNet ONNX model path (defaults to $FACE_DETECTOR_MODEL)
+            recognizer_model (str): SFace ONNX model path (defaults to $FACE_RECOGNIZER_MODEL)
+            dnn_backend (str): 'opencv' or 'openvino' (defaults to $DNN_BACKEND)
         """
         self.logger = setup_logger()
         self.storage_path = storage_path
         self.threshold = threshold
         self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        
+        # Redis verification cache; requests carry on without it if Redis is down
+        pool = redis.ConnectionPool.from_url(
+            redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            socket_connect_timeout=0.1,
+            socket_timeout=0.1
+        )
+        self.cache = redis.Redis(connection_pool=pool)
+        self._cache_retry_at = 0
+        self._cache_lock = threading.Lock()
+        self._pending_invalidations = 0
         
         # Create storage directories
         os.makedirs(self.storage_path, exist_ok=True)
         os.makedirs(os.path.join(self.storage_path, 'images'), exist_ok=True)
         
+        # Load the models once and run a dummy forward pass to warm them up
+        backend_id, target_id = DNN_BACKENDS[(dnn_backend or os.getenv('DNN_BACKEND', 'opencv')).lower()]
+        detector_model = detector_model or os.getenv('FACE_DETECTOR_MODEL', DEFAULT_DETECTOR_MODEL)
+        recognizer_model = recognizer_model or os.getenv('FACE_RECOGNIZER_MODEL', DEFAULT_RECOGNIZER_MODEL)
+        for model_path in (detector_model, recognizer_model):
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(
+                    f"Model file {model_path} not found; download the YuNet and SFace ONNX "
+                    "models from opencv_zoo into models/ (see the Dockerfile)"
+                )
+        self.detector = cv2.FaceDetectorYN.create(
+            detector_model,
+            '',
+            (320, 320),
+            backend_id=backend_id,
+            target_id=target_id
+        )
+        self._detector_lock = threading.Lock()
+        
+        # FaceRecognizerSF only aligns crops; embeddings come from the same ONNX
+        # graph run directly, which takes a whole batch of crops per forward pass
+        self.recognizer = cv2.FaceRecognizerSF.create(
+            recognizer_model,
+            '',
+            backend_id=backend_id,
+            target_id=target_id
+        )
+        self.recognizer_net = cv2.dnn.readNetFromONNX(recognizer_model)
+        self.recognizer_net.setPreferableBackend(backend_id)
+        self.recognizer_net.setPreferableTarget(target_id)
+        self._batch_forward = True
+        self._embed_batch(np.zeros((1, *SFACE_INPUT_SIZE, 3), dtype=np.uint8))
+        
+        # Concurrent requests share the inference queue; the batcher's worker
+        # thread is the only caller of the (non-reentrant) network
+        self._batcher = MicroBatcher(self._embed_batch, max_batch_size=EMBEDDING_BATCH_SIZE)
+        
+        # Face processing runs on a pool so callers can stop waiting on a hung call;
+        # it's wide enough for a full batch of requests to reach the batcher at once
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(os.cpu_count() or 1, EMBEDDING_BATCH_SIZE),
+            thread_name_prefix='face-worker'
+        )
+        
+        # Image files are written off the request path
+        self._io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-writer')
+        
+        # Preallocated buffers that decoded uploads are downscaled into
+        self._image_pool = queue.LifoQueue(maxsize=IMAGE_POOL_SIZE)
+        for _ in range(IMAGE_POOL_SIZE):
+            self._image_pool.put(np.empty((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE, 3), dtype=np.uint8))
+        
+        # Guards face_embeddings and the index against concurrent requests
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        
         self.face_embeddings = {}
+        self.index = EmbeddingIndex(os.path.join(self.storage_path, 'embeddings.npy'))
         self.load_existing_embeddings()
         
     def ping(self):
         """Check if service is healthy"""
         try:
-            # Create a temporary test image
-            test_img = Image.new('RGB', (100, 100), color='white')
-            test_path = os.path.join(self.storage_path, 'test_health_check.jpg')
-            test_img.save(test_path)
-            
-            # Try a basic face detection
-            result = DeepFace.analyze(img_path=test_path, actions=['emotion'])
-            
-            # Clean up
-            os.remove(test_path)
+            # Run the detector on a blank frame to confirm the models are usable
+            test_img = np.full((100, 100, 3), 255, dtype=np.uint8)
+            with self._detector_lock:
+                self.detector.setInputSize((100, 100))
+                self.detector.detect(test_img)
             
             return True
         except Exception as e:
             self.logger.error(f"Service health check failed: {str(e)}")
             raise Exception("Face recognition service unavailable")
             
-    def _process_with_timeout(self, func, *args, **kwargs):
-        """Process function with timeout"""
-        start_time = time.time()
-        result = None
+    def _represent(self, img):
+        """
+        Compute an SFace embedding for the most confident face in an image
         
+        Args:
+            img (np.ndarray): BGR image array
+            
+        Returns:
+            list: Embedding vector
+        """
+        height, width = img.shape[:2]
+        with self._detector_lock:
+            self.detector.setInputSize((width, height))
+            _, faces = self.detector.detect(img)
+        if faces is None:
+            raise ValueError("No face detected")
+        
+        # Each row is a box, five landmarks and a score; align the best one to 112x112
+        face = self.recognizer.alignCrop(img, faces[np.argmax(faces[:, -1])])
+        
+        future = self._batcher.submit(face)
         try:
-            # Check if timeout is exceeded
-            if time.time() - start_time > self.timeout:
-                raise TimeoutError(f"Operation timed out after {self.timeout} seconds")
+            return future.result(timeout=self.timeout).tolist()
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Embedding took longer than {self.timeout}s")
+
+    def _embed_batch(self, faces):
+        """
+        Compute SFace embeddings for a stack of aligned crops in one forward pass
+        
+        Preprocessing matches FaceRecognizerSF.feature: raw pixel values,
+        swapped from BGR to RGB.
+        
+        Args:
+            faces (np.ndarray): (B, 112, 112, 3) BGR crops from alignCrop
             
-            result = func(*args, **kwargs)
+        Returns:
+            np.ndarray: (B, 128) embeddings
+        """
+        if self._batch_forward or len(faces) == 1:
+            try:
+                blob = cv2.dnn.blobFromImages(list(faces), 1.0, SFACE_INPUT_SIZE, (0, 0, 0), True, False)
+                self.recognizer_net.setInput(blob)
+                return self.recognizer_net.forward().reshape(len(faces), -1)
+            except cv2.error as e:
+                if len(faces) == 1:
+                    raise
+                # Models exported with a fixed batch size of 1 take one crop per pass
+                self.logger.warning(f"Batched embedding failed, falling back to one crop per pass: {str(e)}")
+                self._batch_forward = False
+        return np.vstack([self._embed_batch(face[None]) for face in faces])
             
-            # Check timeout again after operation
-            if time.time() - start_time > self.timeout:
-                raise TimeoutError(f"Operation took too long: {time.time() - start_time:.2f} seconds")
-        except TimeoutError as te:
-            self.logger.error(f"Timeout error: {str(te)}")
-            raise
-        except Exception as e:
-            self.logger.error(f"Processing failed: {str(e)}")
-            raise
+    def _cache_key(self, image, min_confidence):
+        """
+        Build the verification cache key for an image
         
-        elapsed_time = time.time() - start_time
-        if elapsed_time > self.timeout:
-            self.logger.warning(f"Processing took too long: {elapsed_time:.2f}s")
-            raise TimeoutError(f"Processing took longer than {self.timeout}s")
+        Args:
+            image (np.ndarray): BGR verification image
+            min_confidence (float): Requested confidence threshold
             
-        return result
+        Returns:
+            str: Cache key
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.resize(gray, CACHE_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        digest = hashlib.blake2b(thumbnail.tobytes(), digest_size=8).hexdigest()
+        return f"verify:{digest}:{min_confidence}"
+
+    def _cache_get(self, key):
+        """
+        Look up a cached verification result
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            tuple: (cache generation, cached result or None); the generation is
+                None if Redis is unavailable
+        """
+        if time.time() < self._cache_retry_at:
+            return None, None
+        # Nothing cached can be trusted until a failed invalidation goes through
+        if not self._flush_invalidation():
+            return None, None
+        try:
+            generation, cached = self.cache.mget(CACHE_GENERATION_KEY, key)
+            generation = int(generation or 0)
+            if cached is None:
+                return generation, None
+            
+            # Entries written before the last registration/update are stale
+            entry = json.loads(cached)
+            if entry['generation'] != generation:
+                return generation, None
+            return generation, entry['result']
+        except redis.RedisError as e:
+            self.logger.warning(f"Verification cache unavailable: {str(e)}")
+            self._cache_retry_at = time.time() + CACHE_RETRY_INTERVAL
+            return None, None
+
+    def _cache_set(self, key, generation, result):
+        """
+        Store a verification result in the cache
+        
+        Args:
+            key (str): Cache key
+            generation (int): Cache generation the result was computed under
+            result (dict): Verification result
+        """
+        if generation is None:
+            return
+        try:
+            entry = json.dumps({'generation': generation, 'result': result})
+            self.cache.setex(key, self.cache_ttl, entry)
+        except redis.RedisError as e:
+            self.logger.warning(f"Verification cache unavailable: {str(e)}")
+            self._cache_retry_at = time.time() + CACHE_RETRY_INTERVAL
+
+    def _invalidate_cache(self):
+        """Invalidate all cached verification results"""
+        with self._cache_lock:
+            self._pending_invalidations += 1
+        # While backing off, the next cache lookup after the back-off flushes it
+        if time.time() >= self._cache_retry_at:
+            self._flush_invalidation()
+
+    def _flush_invalidation(self):
+        """
+        Bump the cache generation for any outstanding invalidations
+        
+        A failed bump stays pending and the cache is bypassed until a later
+        attempt succeeds, so entries from before the change are never served.
+        A successful bump only clears the invalidations counted before it.
+        
+        Returns:
+            bool: True if no invalidation was outstanding or the bump succeeded
+        """
+        with self._cache_lock:
+            pending = self._pending_invalidations
+        if not pending:
+            return True
+        try:
+            self.cache.incr(CACHE_GENERATION_KEY)
+        except redis.RedisError as e:
+            self.logger.warning(f"Failed to invalidate verification cache: {str(e)}")
+            self._cache_retry_at = time.time() + CACHE_RETRY_INTERVAL
+            return False
+        with self._cache_lock:
+            self._pending_invalidations -= pending
+        return True
+
+    def _process_with_timeout(self, func, *args, **kwargs):
+        """
+        Run a function on the worker pool, giving up after self.timeout seconds
+        
+        A call that has already started can't be interrupted; it finishes in
+        the background but no longer holds up the caller.
+        
+        Raises:
+            TimeoutError: If the function doesn't return in time
+        """
+        future = self._executor.submit(func, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.logger.error(f"{func.__name__} timed out after {self.timeout}s")
+            raise TimeoutError(f"Operation timed out after {self.timeout} seconds")
 
     def load_existing_embeddings(self):
         """Load existing face embeddings from storage"""
+        metadata_file = os.path.join(self.storage_path, 'metadata.json')
+        legacy_file = os.path.join(self.storage_path, 'embeddings.json')
         try:
-            embeddings_file = os.path.join(self.storage_path, 'embeddings.json')
-            if os.path.exists(embeddings_file):
-                with open(embeddings_file, 'r') as f:
-                    self.face_embeddings = json.load(f)
-                    self.logger.info(f"Loaded {len(self.face_embeddings)} face embeddings")
+            stored = None
+            if os.path.exists(metadata_file):
+                with open(metadata_file, 'r') as f:
+                    stored = json.load(f)
+            
+            # Embeddings from another model aren't comparable, so those users must re-register
+            if stored is not None and stored.get('model', 'Facenet') != EMBEDDING_MODEL:
+                model = stored.get('model', 'Facenet')
+                self._archive_embeddings(model.lower(), f"from {model}")
+                stored = None
+            elif stored is None and os.path.exists(legacy_file):
+                self._archive_embeddings('facenet', "from Facenet")
+            
+            if stored:
+                users = stored['users']
+                rows = {user_id: data.pop('idx') for user_id, data in users.items()}
+                self.face_embeddings = users
+                if rows:
+                    self.index.load(sorted(rows, key=rows.get))
+                self.logger.info(f"Loaded {len(self.face_embeddings)} face embeddings")
             else:
                 self.face_embeddings = {}
                 self.logger.info("No existing embeddings found")
         except Exception as e:
             self.logger.error(f"Error loading embeddings: {str(e)}")
+            # Move the files aside so new registrations don't overwrite them;
+            # if even that fails, startup fails rather than risk the data
+            self._archive_embeddings(f"unreadable_{datetime.now().strftime('%Y%m%d_%H%M%S')}", "as unreadable")
             self.face_embeddings = {}
+            self.index.build({})
+
+    def _archive_embeddings(self, suffix, reason):
+        """
+        Move stored embeddings out of the way, keeping them as .bak files
+        
+        Args:
+            suffix (str): Inserted before .bak in the archived file names
+            reason (str): Why they were archived, for the log
+        """
+        for filename in ('metadata.json', 'embeddings.npy', 'embeddings_scales.npy', 'embeddings.json'):
+            path = os.path.join(self.storage_path, filename)
+            if os.path.exists(path):
+                os.replace(path, f"{path}.{suffix}.bak")
+                self.logger.warning(f"Archived {filename} {reason}; affected users need to re-register")
 
     def save_embeddings(self):
-        """Save face embeddings to storage"""
+        """
+        Save face metadata to storage
+        
+        Embedding vectors are written to the memory-mapped matrix as they are
+        added, so only the user records and their matrix rows are written here.
+        The file is written to a temporary path and atomically renamed into
+        place so readers never see a partial write.
+        """
         try:
-            embeddings_file = os.path.join(self.storage_path, 'embeddings.json')
-            with open(embeddings_file, 'w') as f:
-                json.dump(self.face_embeddings, f)
-            self.logger.info(f"Saved {len(self.face_embeddings)} face embeddings")
+            metadata_file = os.path.join(self.storage_path, 'metadata.json')
+            tmp_file = f"{metadata_file}.tmp"
+            # Snapshot under the save lock so an older snapshot can't be written after a newer one
+            with self._save_lock:
+                with self._lock:
+                    users = {
+                        user_id: {**data, 'idx': self.index.position(user_id)}
+                        for user_id, data in self.face_embeddings.items()
+                    }
+                
+                with open(tmp_file, 'w') as f:
+                    json.dump({'model': EMBEDDING_MODEL, 'users': users}, f)
+                os.replace(tmp_file, metadata_file)
+            self.logger.info(f"Saved {len(users)} face embeddings")
         except Exception as e:
             self.logger.error(f"Error saving embeddings: {str(e)}")
 
-    def save_image(self, user_id, image_data, prefix='reg'):
+    def _schedule_save(self):
+        """Save embeddings once no further changes arrive for SAVE_DEBOUNCE_SECONDS"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.save_embeddings)
+            self._save_timer.start()
+
+    @contextmanager
+    def _decoded_image(self, image_data):
         """
-        Save image to storage
+        Decode a base64 image into a pooled BGR buffer no larger than MAX_IMAGE_SIDE
+        
+        The yielded array may share memory with a pooled buffer, so it must
+        not be used after the `with` block ends.
         
         Args:
-            user_id (str): User ID
             image_data (str): Base64 encoded image
+        """
+        raw = _decode_base64(image_data)
+        
+        # Read just the header to pick the cheapest decode scale
+        width, height = Image.open(io.BytesIO(raw)).size
+        flags = cv2.IMREAD_COLOR
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if max(width, height) // factor >= MAX_IMAGE_SIDE:
+                flags = reduced_flag
+                break
+        
+        decoded = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), flags)
+        if decoded is None:
+            raise ValueError("Could not decode image")
+        
+        height, width = decoded.shape[:2]
+        scale = MAX_IMAGE_SIDE / max(height, width)
+        if scale >= 1:
+            yield decoded
+            return
+        
+        try:
+            buffer = self._image_pool.get_nowait()
+        except queue.Empty:
+            buffer = np.empty((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE, 3), dtype=np.uint8)
+        try:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            yield cv2.resize(decoded, size, dst=buffer[:size[1], :size[0]], interpolation=cv2.INTER_AREA)
+        finally:
+            try:
+                self._image_pool.put_nowait(buffer)
+            except queue.Full:
+                pass
+
+    def save_image(self, user_id, image, prefix='reg'):
+        """
+        Save image to storage in the background
+        
+        Args:
+            user_id (str): User ID
+            image (np.ndarray): Decoded BGR image
             prefix (str): Prefix for image filename
             
         Returns:
-            str: Path to saved image
+            str: Path the image is being written to
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{prefix}_{user_id}_{timestamp}.jpg"
+        filepath = os.path.join(self.storage_path, 'images', filename)
+        
+        self._write_image(image, filepath)
+        return filepath
+
+    def _write_image(self, image, filepath):
+        """
+        Encode a BGR image as JPEG and write it to storage in the background
+        
+        Encoding happens up front so the caller can release the image buffer.
+        
+        Args:
+            image (np.ndarray): BGR image array
+            filepath (str): Destination path
+        """
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            self.logger.error(f"Error encoding image {filepath}")
+            return
+        self._io_executor.submit(self._write_file, encoded, filepath)
+
+    def _write_file(self, data, filepath):
+        """
+        Write encoded image bytes to storage
+        
+        Args:
+            data (np.ndarray): Encoded image bytes
+            filepath (str): Destination path
         """
         try:
-            image = Image.open(io.BytesIO(base64.b64decode(image_data)))
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{prefix}_{user_id}_{timestamp}.jpg"
-            filepath = os.path.join(self.storage_path, 'images', filename)
-            
-            image.save(filepath)
-            self.logger.info(f"Saved image: {filename}")
-            return filepath
+            with open(filepath, 'wb') as f:
+                f.write(data)
+            self.logger.info(f"Saved image: {os.path.basename(filepath)}")
         except Exception as e:
-            self.logger.error(f"Error saving image: {str(e)}")
-            return None
+            self.logger.error(f"Error saving image {filepath}: {str(e)}")
 
     def register_face(self, user_id, image_data, metadata=None):
         """
@@ -168,30 +569,27 @@ class FaceRecognitionService:
     def _register_face(self, user_id, image_data, metadata):
         """Internal method to register face"""
         try:
-            # Convert base64 image to PIL Image
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Save image to storage
             image_path = os.path.join(self.storage_path, 'images', f'{user_id}.jpg')
-            image.save(image_path)
             
-            # Extract face embeddings
-            embedding = DeepFace.represent(
-                img_path=image_path,
-                model_name='Facenet',
-                enforce_detection=False
-            )
+            # Decode base64 image straight into a downscaled BGR buffer
+            with self._decoded_image(image_data) as image:
+                embedding = self._represent(image)
+                
+                # Save image to storage in the background
+                self._write_image(image, image_path)
             
             # Store embeddings with metadata
-            self.face_embeddings[user_id] = {
-                'embedding': embedding,
-                'metadata': metadata,
-                'last_updated': datetime.now().isoformat()
-            }
+            with self._lock:
+                self.index.add(user_id, embedding)
+                self.face_embeddings[user_id] = {
+                    'metadata': metadata,
+                    'last_updated': datetime.now().isoformat(),
+                    'image_path': image_path
+                }
             
             # Save to disk
-            self._save_embeddings()
+            self._schedule_save()
+            self._invalidate_cache()
             
             return {
                 'status': 'success',
@@ -201,111 +599,82 @@ class FaceRecognitionService:
         except Exception as e:
             self.logger.error(f"Error in face registration for user {user_id}: {str(e)}")
             raise
-            
-            # Save image
-            image_path = os.path.join(self.storage_path, 'images', f"{user_id}.jpg")
-            image.save(image_path)
-            
-            # Get face embedding
-            embedding = DeepFace.represent(image_path, model_name='Facenet')
-            
-            # Store embedding
-            self.face_embeddings[user_id] = {
-                'embedding': embedding,
-                'metadata': metadata or {},
-                'registered_at': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat(),
-                'image_path': image_path
-            }
-            
-            self.save_embeddings()
-            
-            return {
-                "status": "success",
-                "message": "Face registered successfully",
-                "user_id": user_id,
-                "image_path": image_path
-            }
-        except Exception as e:
-            self.logger.error(f"Registration error for user {user_id}: {str(e)}")
-            return {
-                "status": "error",
-                "message": str(e)
-            }
 
-    def verify_face(self, image_data, min_confidence=0.7):
+    def verify_face(self, image_data, min_confidence=None):
         """
         Verify a face against registered faces
         
         Args:
             image_data (str): Base64 encoded image
-            min_confidence (float): Minimum confidence required for match
+            min_confidence (float): Minimum cosine similarity required for a
+                match (defaults to self.threshold)
             
         Returns:
             dict: Verification result
         """
+        if min_confidence is None:
+            min_confidence = self.threshold
         try:
-            # Save the verification image
-            image_path = self.save_image('verify', image_data, 'verify')
-            if not image_path:
-                return {
-                    "status": "error",
-                    "message": "Failed to save verification image"
-                }
-
-            # Convert base64 to image
-            image = Image.open(io.BytesIO(base64.b64decode(image_data)))
-            
-            # Get face embedding for the input image
-            try:
-                input_embedding = DeepFace.represent(
-                    np.array(image), 
-                    model_name='Facenet',
-                    enforce_detection=False
-                )
-            except Exception as e:
-                self.logger.error(f"Face detection error in verification: {str(e)}")
-                return {
-                    "status": "error",
-                    "message": "No face detected in verification image"
-                }
+            return self._process_with_timeout(self._verify_face, image_data, min_confidence)
+        except TimeoutError as te:
+            return {
+                "status": "error",
+                "message": str(te)
+            }
 
-            # Compare with all stored embeddings
-            matches = []
-            for user_id, data in self.face_embeddings.items():
-                embedding = data["embedding"]
+    def _verify_face(self, image_data, min_confidence):
+        """Internal method to verify face"""
+        try:
+            # Decode once; the same pixels feed the cache key, the embedding and the saved copy
+            with self._decoded_image(image_data) as image:
+                image_path = self.save_image('verify', image, 'verify')
                 
-                # Calculate cosine distance
-                distance = np.linalg.norm(np.array(input_embedding) - np.array(embedding))
-                confidence = 1 - distance
+                # Repeated frames skip inference entirely
+                cache_key = self._cache_key(image, min_confidence)
+                cache_generation, cached = self._cache_get(cache_key)
+                if cached:
+                    if cached.get("match_found"):
+                        cached["verification_image"] = image_path
+                    return cached
+                
+                # Get face embedding for the input image
+                try:
+                    input_embedding = self._represent(image)
+                except Exception as e:
+                    self.logger.error(f"Face detection error in verification: {str(e)}")
+                    return {
+                        "status": "error",
+                        "message": "No face detected in verification image"
+                    }
+
+            # Find the closest stored embedding
+            with self._lock:
+                match = self.index.search(input_embedding)
+                if match:
+                    metadata = self.face_embeddings[match[0]].get("metadata", {})
+            if match:
+                user_id, confidence = match
                 
                 if confidence >= min_confidence:
-                    matches.append({
+                    result = {
+                        "status": "success",
+                        "match_found": True,
                         "user_id": user_id,
                         "confidence": confidence,
-                        "metadata": data.get("metadata", {})
-                    })
+                        "metadata": metadata,
+                        "verification_image": image_path,
+                        "message": "Face matched successfully"
+                    }
+                    self._cache_set(cache_key, cache_generation, result)
+                    return result
 
-            if matches:
-                # Sort matches by confidence
-                matches.sort(key=lambda x: x["confidence"], reverse=True)
-                best_match = matches[0]
-                
-                return {
-                    "status": "success",
-                    "match_found": True,
-                    "user_id": best_match["user_id"],
-                    "confidence": best_match["confidence"],
-                    "metadata": best_match["metadata"],
-                    "verification_image": image_path,
-                    "message": "Face matched successfully"
-                }
-            else:
-                return {
-                    "status": "success",
-                    "match_found": False,
-                    "message": "No matching face found"
-                }
+            result = {
+                "status": "success",
+                "match_found": False,
+                "message": "No matching face found"
+            }
+            self._cache_set(cache_key, cache_generation, result)
+            return result
         except Exception as e:
             self.logger.error(f"Verification error: {str(e)}")
             return {
@@ -324,8 +693,10 @@ class FaceRecognitionService:
             dict: User face information
         """
         try:
-            if user_id in self.face_embeddings:
-                data = self.face_embeddings[user_id]
+            with self._lock:
+                data = dict(self.face_embeddings.get(user_id) or {})
+            
+            if data:
                 return {
                     "status": "success",
                     "user_id": user_id,
@@ -357,10 +728,15 @@ class FaceRecognitionService:
             dict: Update result
         """
         try:
-            if user_id in self.face_embeddings:
-                self.face_embeddings[user_id]["metadata"] = metadata
-                self.face_embeddings[user_id]["last_updated"] = datetime.now().isoformat()
-                self.save_embeddings()
+            with self._lock:
+                found = user_id in self.face_embeddings
+                if found:
+                    self.face_embeddings[user_id]["metadata"] = metadata
+                    self.face_embeddings[user_id]["last_updated"] = datetime.now().isoformat()
+            
+            if found:
+                self._schedule_save()
+                self._invalidate_cache()
                 return {
                     "status": "success",
                     "message": "Metadata updated successfully"
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from services import embedding_index
+from services.embedding_index import INITIAL_CAPACITY, EmbeddingIndex
+
+DIM = 128
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / 'embeddings.npy')
+
+
+def test_add_then_search_returns_same_user(index_path, rng):
+    index = EmbeddingIndex(index_path)
+    vectors = {f"user{i}": rng.standard_normal(DIM) for i in range(10)}
+    for user_id, vector in vectors.items():
+        index.add(user_id, vector)
+
+    for user_id, vector in vectors.items():
+        match, score = index.search(vector)
+        assert match == user_id
+        assert 0.99 < score <= 1.0
+
+
+def test_search_empty_index_returns_none(index_path, rng):
+    assert EmbeddingIndex(index_path).search(rng.standard_normal(DIM)) is None
+
+
+def test_reregistration_overwrites_row_in_place(index_path, rng):
+    index = EmbeddingIndex(index_path)
+    index.add('alice', rng.standard_normal(DIM))
+    index.add('bob', rng.standard_normal(DIM))
+    row = index.position('alice')
+
+    replacement = rng.standard_normal(DIM)
+    index.add('alice', replacement)
+
+    assert len(index) == 2
+    assert index.position('alice') == row
+    assert index.search(replacement)[0] == 'alice'
+
+
+def test_growing_past_initial_capacity_keeps_rows(index_path, rng):
+    index = EmbeddingIndex(index_path)
+    vectors = rng.standard_normal((INITIAL_CAPACITY + 10, DIM))
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+
+    assert index.codes.shape[0] > INITIAL_CAPACITY
+    for i, vector in enumerate(vectors):
+        assert index.search(vector)[0] == f"user{i}"
+
+
+def test_load_after_restart_returns_same_results(index_path, rng):
+    index = EmbeddingIndex(index_path)
+    vectors = rng.standard_normal((20, DIM))
+    for i, vector in enumerate(vectors):
+        index.add(f"user{i}", vector)
+    queries = vectors + 0.1 * rng.standard_normal(vectors.shape)
+    before = [index.search(query) for query in queries]
+
+    reloaded = EmbeddingIndex(index_path)
+    reloaded.load(index.user_ids)
+
+    assert [reloaded.search(query) for query in queries] == before
+
+
+@pytest.mark.skipif(embedding_index.njit is None, reason="numba not installed")
+def test_numba_and_numpy_scans_agree(index_path, rng, monkeypatch):
+    index = EmbeddingIndex(index_path)
+    for i, vector in enumerate(rng.standard_normal((100, DIM))):
+        index.add(f"user{i}", vector)
+    queries = rng.standard_normal((10, DIM))
+
+    numba_results = [index.search(query) for query in queries]
+    monkeypatch.setattr(embedding_index, 'njit', None)
+    numpy_results = [index.search(query) for query in queries]
+
+    for (numba_user, numba_score), (numpy_user, numpy_score) in zip(numba_results, numpy_results):
+        assert numba_user == numpy_user
+        assert numba_score == pytest.approx(numpy_score, abs=1e-5)
@@ -1,33 +1,54 @@
+import atexit
 import logging
 import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_setup_lock = threading.Lock()
 
 def setup_logger():
-    """Setup logger with file and console handlers"""
-    log_dir = 'logs'
-    os.makedirs(log_dir, exist_ok=True)
-    
-    log_file = os.path.join(log_dir, f'face_recognition_{datetime.now().strftime("%Y%m%d")}.log')
-    
+    """
+    Setup logger with file and console handlers
+
+    Handlers are only attached on the first call, so repeated calls return the
+    same logger. Callers just enqueue records; a background listener thread
+    does the actual file and console writes.
+    """
     # Create logger
     logger = logging.getLogger('face_recognition')
-    logger.setLevel(logging.DEBUG)
-    
-    # Create file handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    
-    # Create formatter and add it to the handlers
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-    
-    # Add handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    with _setup_lock:
+        if logger.handlers:
+            return logger
+
+        logger.setLevel(logging.DEBUG)
+
+        log_dir = 'logs'
+        os.makedirs(log_dir, exist_ok=True)
+
+        log_file = os.path.join(log_dir, f'face_recognition_{datetime.now().strftime("%Y%m%d")}.log')
+
+        # Create file handler, capped at 5 x 10MB
+        file_handler = RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5)
+        file_handler.setLevel(logging.DEBUG)
+
+        # Create console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+
+        # Create formatter and add it to the handlers
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler.setFormatter(formatter)
+        console_handler.setFormatter(formatter)
+
+        # Route records through a queue to the handlers on a background thread
+        log_queue = queue.Queue()
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+        logger.addHandler(QueueHandler(log_queue))
+
     return logger